@@ -1,30 +1,58 @@
 # application.py
 
+import atexit
 import os
 import sys
+import threading
 import time
 import traceback
 import hashlib
-import json
 import re
 import shutil
+import subprocess
 import tempfile
-from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import Future, ThreadPoolExecutor, ProcessPoolExecutor
+from functools import lru_cache
 
 import librosa
 import numpy as np
+import orjson
+import soundfile as sf
 import yt_dlp
-from flask import Flask, jsonify, request, send_from_directory
+from flask import Flask, Response, jsonify, request, send_from_directory
+from flask.json.provider import JSONProvider
+from flask_compress import Compress
 from werkzeug.utils import secure_filename
 from werkzeug.exceptions import HTTPException
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+from cachetools import TTLCache
+from scipy.signal import find_peaks
 
 # --- 1. 환경 설정 및 Flask 앱 초기화 ---
 
 YOUTUBE_COOKIES_ENV = os.environ.get('YOUTUBE_COOKIES')
 COOKIE_FILE_PATH = '/tmp/cookies.txt'
 
+class OrjsonProvider(JSONProvider):
+    """Flask JSON provider backed by orjson, so jsonify uses the fast path."""
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 application = Flask(__name__, static_folder='frontend/dist', static_url_path='')
+application.json = OrjsonProvider(application)
+Compress(application)
+
+@application.after_request
+def add_static_cache_headers(response):
+    # Vite fingerprints everything under /assets/, so those URLs are
+    # immutable; one transfer per client instead of a round trip per visit.
+    if request.path.startswith('/assets/'):
+        response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
 
 DOWNLOAD_DIRECTORY = '/var/app/current/downloads'
 application.config['UPLOAD_FOLDER'] = DOWNLOAD_DIRECTORY
@@ -32,7 +60,23 @@ application.config['CACHE_FOLDER'] = '/tmp/yt-hl-cache'
 
 # --- 2. 스레드 풀 및 에러 핸들러 ---
 application.audio_executor = ThreadPoolExecutor(max_workers=1) # Reduced for stability
-application.audio_analysis_futures = {}
+# librosa/NumPy hold the GIL for long stretches, so the CPU-bound analysis
+# stage runs in a separate process pool; the thread pool above stays for the
+# I/O-bound download/orchestration work.
+application.analysis_executor = ProcessPoolExecutor(max_workers=max(1, (os.cpu_count() or 2) // 2))
+# Small pool for heatmap scrapes so they can overlap the audio download
+# instead of queueing behind it.
+application.heatmap_executor = ThreadPoolExecutor(max_workers=2)
+# Completion stage of the download -> analysis pipeline: waits on the
+# process-pool result and publishes it, so the single download worker is
+# released as soon as the handoff happens and the next queued download can
+# overlap the running analysis.
+application.finalize_executor = ThreadPoolExecutor(max_workers=2)
+# Bounded with a TTL so completed/orphaned futures cannot accumulate for the
+# lifetime of a long-running EB instance. TTLCache is not thread-safe, so all
+# access goes through futures_lock.
+application.audio_analysis_futures = TTLCache(maxsize=1024, ttl=3600)
+application.futures_lock = threading.Lock()
 application.analysis_status_store = {} # New: To store detailed progress
 
 @application.errorhandler(Exception)
@@ -53,24 +97,63 @@ def handle_exception(e):
 os.makedirs(application.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(application.config['CACHE_FOLDER'], exist_ok=True)
 
+# Containers the downloader may hand us now that we keep the native stream
+# instead of transcoding everything to mp3.
+AUDIO_EXTENSIONS = ('.mp3', '.m4a', '.webm', '.opus', '.ogg')
+
+def _safe_unlink(path):
+    """Unlink without a prior exists() stat; returns whether a file was removed."""
+    try:
+        os.unlink(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+def find_audio_file(directory, key):
+    """Return the downloaded audio file for a cache key, whatever the container."""
+    for ext in AUDIO_EXTENSIONS:
+        path = os.path.join(directory, f"{key}{ext}")
+        if os.path.exists(path):
+            return path
+    return None
+
 def cleanup_on_startup():
     """Cleans up orphaned files from previous runs."""
     application.logger.info("Running startup cleanup...")
     download_dir = application.config['UPLOAD_FOLDER']
     cache_dir = application.config['CACHE_FOLDER']
-    
+
     if not os.path.exists(download_dir) or not os.path.exists(cache_dir):
         application.logger.info("Download or cache directory does not exist, skipping cleanup.")
         return
 
-    # Get sets of keys from filenames
+    # Get sets of keys from filenames. os.scandir avoids the extra stat per
+    # entry that listdir + exists-style checks would cost on a full cache dir.
     try:
-        download_keys = {os.path.splitext(f)[0] for f in os.listdir(download_dir) if f.endswith('.mp3')}
-        cache_keys = {os.path.splitext(f)[0] for f in os.listdir(cache_dir) if f.endswith('.json')}
+        with os.scandir(download_dir) as it:
+            download_files = {os.path.splitext(e.name)[0]: e.name for e in it
+                              if os.path.splitext(e.name)[1] in AUDIO_EXTENSIONS}
+        download_keys = set(download_files)
+        cache_keys = set()
+        stale_tmp_files = []
+        with os.scandir(cache_dir) as it:
+            for e in it:
+                if e.name.endswith('.json'):
+                    cache_keys.add(os.path.splitext(e.name)[0])
+                elif '.json.tmp.' in e.name:
+                    # Leftover from a write-then-rename interrupted by a crash.
+                    stale_tmp_files.append(e.path)
     except Exception as e:
         application.logger.error(f"Error reading directories during cleanup: {e}")
         return
 
+    for tmp_path in stale_tmp_files:
+        try:
+            os.remove(tmp_path)
+            application.logger.info(f"Removed stale cache temp file: {os.path.basename(tmp_path)}")
+        except OSError as e:
+            application.logger.error(f"Error removing stale temp file {tmp_path}: {e}")
+
     # Find orphaned files
     orphaned_downloads = download_keys - cache_keys
     orphaned_caches = cache_keys - download_keys
@@ -78,10 +161,10 @@ def cleanup_on_startup():
     # Remove orphaned downloads
     for key in orphaned_downloads:
         try:
-            os.remove(os.path.join(download_dir, f"{key}.mp3"))
-            application.logger.info(f"Removed orphaned download: {key}.mp3")
+            os.remove(os.path.join(download_dir, download_files[key]))
+            application.logger.info(f"Removed orphaned download: {download_files[key]}")
         except Exception as e:
-            application.logger.error(f"Error removing orphaned download {key}.mp3: {e}")
+            application.logger.error(f"Error removing orphaned download {download_files[key]}: {e}")
 
     # Remove orphaned cache files
     for key in orphaned_caches:
@@ -95,17 +178,17 @@ def cleanup_on_startup():
     for key in cache_keys - orphaned_caches:
         cache_file = os.path.join(cache_dir, f"{key}.json")
         try:
-            with open(cache_file, 'r') as f:
-                json.load(f)
-        except json.JSONDecodeError:
+            with open(cache_file, 'rb') as f:
+                orjson.loads(f.read())
+        except orjson.JSONDecodeError:
             application.logger.warning(f"Removing corrupt cache file: {key}.json")
             try:
                 os.remove(cache_file)
-                # Also remove the corresponding mp3, as we can't trust the cached data
-                mp3_file = os.path.join(download_dir, f"{key}.mp3")
-                if os.path.exists(mp3_file):
-                    os.remove(mp3_file)
-                    application.logger.info(f"Also removed corresponding mp3 for corrupt cache: {key}.mp3")
+                # Also remove the corresponding audio, as we can't trust the cached data
+                audio_file = find_audio_file(download_dir, key)
+                if audio_file:
+                    os.remove(audio_file)
+                    application.logger.info(f"Also removed corresponding audio for corrupt cache: {os.path.basename(audio_file)}")
             except Exception as e:
                 application.logger.error(f"Error removing corrupt cache file {key}.json: {e}")
 
@@ -115,61 +198,217 @@ def cleanup_on_startup():
 # Call cleanup at startup
 cleanup_on_startup()
 
+# Compiled once at import; these run on every request on the poll path.
+# One alternation instead of three sequential searches over a multi-MB page;
+# the </script> anchor of the old first variant is redundant with the `});`
+# terminator. Bytes pattern so the raw response body is searched without a
+# full-page UTF-8 decode; orjson takes the matched slice as bytes directly.
+YT_INITIAL_DATA_RE = re.compile(rb'(?:var\s+ytInitialData|window\["ytInitialData"\])\s*=\s*({.*?});')
+
+# Single alternation so every URL shape is handled in one search() call
+# instead of iterating separate patterns.
+YOUTUBE_ID_RE = re.compile(r'(?:youtube\.com/(?:watch\?v=|shorts/)|youtu\.be/)([\w-]+)')
+
+def extract_video_id(youtube_url):
+    match = YOUTUBE_ID_RE.search(youtube_url)
+    return match.group(1) if match else None
+
+@lru_cache(maxsize=4096)
 def get_cache_key(youtube_url):
-    video_id = None
-    patterns = [r'(?:youtube\.com/watch\?v=|youtu\.be/)([\w-]+)', r'youtube\.com/shorts/([\w-]+)']
-    for pattern in patterns:
-        match = re.search(pattern, youtube_url)
-        if match:
-            video_id = match.group(1)
-            break
+    # Pure function of the URL; the status endpoint is polled with the same
+    # URL every second, so memoizing skips the regex/md5 work after the
+    # first call.
+    video_id = extract_video_id(youtube_url)
     if not video_id:
-        return hashlib.md5(youtube_url.encode()).hexdigest()
+        # blake2b is the fastest stdlib hash; this is a filename key, not a
+        # security boundary, so 16 bytes of digest is plenty.
+        return hashlib.blake2b(youtube_url.encode(), digest_size=16).hexdigest()
     return video_id
 
+# Cache writes are debounced: save_to_cache drops the payload in a dirty map
+# and a daemon thread flushes it to disk once a second, collapsing bursts of
+# writes for the same key into one file write.
+application.cache_write_lock = threading.Lock()
+application.pending_cache_writes = {}
+
+def flush_pending_cache_writes():
+    with application.cache_write_lock:
+        dirty = list(application.pending_cache_writes.items())
+        application.pending_cache_writes.clear()
+    for cache_key, data in dirty:
+        try:
+            write_cache_file(cache_key, data)
+        except Exception as e:
+            application.logger.error(f"[CACHE_FLUSH] Failed to write cache for {cache_key}: {e}")
+
+def _cache_flusher():
+    while True:
+        time.sleep(1.0)
+        flush_pending_cache_writes()
+
+threading.Thread(target=_cache_flusher, daemon=True).start()
+atexit.register(flush_pending_cache_writes)
+
+def _shutdown_executors():
+    # Drop queued-but-unstarted work so a gunicorn worker restart doesn't
+    # hang draining the download queue; running tasks finish normally.
+    application.audio_executor.shutdown(wait=False, cancel_futures=True)
+    application.heatmap_executor.shutdown(wait=False, cancel_futures=True)
+    application.finalize_executor.shutdown(wait=False, cancel_futures=True)
+    application.analysis_executor.shutdown(wait=False, cancel_futures=True)
+
+atexit.register(_shutdown_executors)
+
+def check_cache_bytes(cache_key):
+    """Return the raw cached JSON bytes for a key, or None on a miss.
+
+    Endpoints that only forward a cache hit to the client can send these
+    bytes directly instead of paying a decode + jsonify re-encode per poll.
+    """
+    # A pending (not yet flushed) write is the freshest copy.
+    with application.cache_write_lock:
+        pending = application.pending_cache_writes.get(cache_key)
+    if pending is not None:
+        return orjson.dumps(pending, option=orjson.OPT_INDENT_2)
+    cache_file = os.path.join(application.config['CACHE_FOLDER'], f"{cache_key}.json")
+    try:
+        raw = _read_cache_file(cache_file, os.stat(cache_file).st_mtime_ns)
+    except OSError:
+        return None
+    return raw if raw.strip() else None
+
+@lru_cache(maxsize=512)
+def _read_cache_file(cache_file, mtime_ns):
+    # mtime is part of the key, so a rewritten file invalidates itself; the
+    # polling frontend otherwise re-reads the same finished payload from
+    # disk once a second.
+    with open(cache_file, 'rb') as f:
+        return f.read()
+
 def check_cache(cache_key):
+    raw = check_cache_bytes(cache_key)
+    if raw is None:
+        return None
+    try:
+        return orjson.loads(raw)
+    except Exception:
+        return None
+
+def write_cache_file(cache_key, data):
     cache_file = os.path.join(application.config['CACHE_FOLDER'], f"{cache_key}.json")
-    if os.path.exists(cache_file):
-        try:
-            with open(cache_file, 'r') as f: return json.load(f)
-        except Exception: return None
-    return None
+    # Write-then-rename so a killed worker can never leave truncated JSON
+    # where check_cache_bytes would serve it.
+    tmp_file = f"{cache_file}.tmp.{os.getpid()}"
+    with open(tmp_file, 'wb') as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+    os.replace(tmp_file, cache_file)
 
 def save_to_cache(cache_key, data):
-    cache_file = os.path.join(application.config['CACHE_FOLDER'], f"{cache_key}.json")
-    with open(cache_file, 'w') as f: json.dump(data, f, indent=2)
+    with application.cache_write_lock:
+        application.pending_cache_writes[cache_key] = data
+
+# Size cap for retained downloads; trades disk for skipping the throttled
+# multi-minute YouTube round-trip when a key is re-analyzed.
+MAX_AUDIO_CACHE_BYTES = 2 * 1024 ** 3
+
+def evict_audio_lru(directory, keep_path=None, max_bytes=MAX_AUDIO_CACHE_BYTES):
+    """Remove least-recently-used files until the directory is under max_bytes."""
+    try:
+        with os.scandir(directory) as it:
+            entries = [(e.stat().st_atime, e.stat().st_size, e.path) for e in it if e.is_file()]
+    except OSError as e:
+        application.logger.error(f"[AUDIO_LRU] Could not scan {directory}: {e}")
+        return
+    total = sum(size for _, size, _ in entries)
+    for atime, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if path == keep_path:
+            continue
+        try:
+            os.remove(path)
+            total -= size
+            application.logger.info(f"[AUDIO_LRU] Evicted {path} ({size} bytes)")
+        except OSError as e:
+            application.logger.error(f"[AUDIO_LRU] Could not evict {path}: {e}")
+
+application.shared_ydl = {}  # one reusable instance per output path
+application.ydl_lock = threading.Lock()
+# Per-call progress callback for the shared instances; the persistent
+# dispatcher below forwards to it, so no per-download hook registration
+# (and no reaching into yt-dlp private state) is needed. Guarded by
+# ydl_lock like everything else touching the shared instances.
+application.ydl_progress_hook = None
+
+def _ydl_progress_dispatch(d):
+    hook = application.ydl_progress_hook
+    if hook:
+        hook(d)
+
+def get_shared_ydl(output_path):
+    """Build one YoutubeDL instance per output path and reuse it across downloads.
+
+    Extractor registration, option normalization, and cookiejar loading are
+    per-instance costs; the download pool is single-worker so reuse is safe,
+    and ydl_lock covers any other caller.
+    """
+    ydl = application.shared_ydl.get(output_path)
+    if ydl is None:
+        ydl_opts = {
+            # Prefer audio-only streams in containers we decode directly,
+            # so no ffmpeg remux/re-encode ever runs; keep worst-quality
+            # preference since the energy analysis is coarse.
+            'format': 'worstaudio[ext=m4a]/worstaudio[acodec=opus]/worstaudio/worst',
+            # No FFmpegExtractAudio postprocessor: the energy analysis
+            # decodes whatever container YouTube serves, so the
+            # download-then-transcode-to-mp3 round trip is pure overhead.
+            'outtmpl': os.path.join(output_path, '%(id)s.%(ext)s'),
+            'quiet': True, # Suppress verbose output
+            'no_warnings': True,
+            'nocheckcertificate': True, 'ignoreerrors': False,
+            # Analysis is capped at MAX_ANALYSIS_SECONDS anyway, so don't
+            # fetch audio past it; fragmented (HLS/DASH) sources also gain
+            # from fetching fragments in parallel.
+            'download_ranges': yt_dlp.utils.download_range_func(None, [(0, MAX_ANALYSIS_SECONDS)]),
+            'concurrent_fragment_downloads': 4,
+            'progress_hooks': [_ydl_progress_dispatch],
+            'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
+        }
+
+        if COOKIE_FILE_PATH and os.path.exists(COOKIE_FILE_PATH):
+            ydl_opts['cookiefile'] = COOKIE_FILE_PATH
+            application.logger.info(f"[DOWNLOAD] Using cookie file from: {COOKIE_FILE_PATH}")
+        else:
+            # Only pace ourselves when anonymous; a signed-in session does
+            # not need the bot-detection throttle, which otherwise
+            # dominates end-to-end latency.
+            ydl_opts.update({'throttledratelimit': 1024*1024, 'sleep_interval_requests': 2, 'max_sleep_interval': 5})
+            application.logger.warning(f"[DOWNLOAD] Cookie file not found at {COOKIE_FILE_PATH}. Proceeding without cookies.")
+
+        ydl = yt_dlp.YoutubeDL(ydl_opts)
+        application.shared_ydl[output_path] = ydl
+    return ydl
 
 def download_audio(youtube_url, output_path='.', progress_hook=None):
+    # Reuse a previously downloaded file for this video if we still have it.
+    video_id = extract_video_id(youtube_url)
+    if video_id:
+        existing = find_audio_file(output_path, video_id)
+        if existing:
+            application.logger.info(f"[DOWNLOAD] Reusing cached audio: {existing}")
+            return existing
     # EB-FIX: Use a temporary directory for each download to prevent race conditions
     # in multi-worker environments like Elastic Beanstalk.
     with tempfile.TemporaryDirectory() as tmpdir:
         try:
-            output_template = os.path.join(tmpdir, '%(id)s.%(ext)s')
-            ydl_opts = {
-                'format': 'worstaudio/worst',
-                'outtmpl': output_template,
-                'progress_hooks': [progress_hook] if progress_hook else [],
-                'postprocessors': [{
-                    'key': 'FFmpegExtractAudio',
-                    'preferredcodec': 'mp3',
-                    'preferredquality': '192',
-                }],
-                'outtmpl': os.path.join(output_path, '%(id)s.%(ext)s'),
-                'quiet': True, # Suppress verbose output
-                'no_warnings': True,
-                'nocheckcertificate': True, 'ignoreerrors': False, 'throttledratelimit': 1024*1024,
-                'sleep_interval_requests': 2, 'max_sleep_interval': 5,
-                'user_agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/119.0.0.0 Safari/537.36',
-            }
-            
-            if COOKIE_FILE_PATH and os.path.exists(COOKIE_FILE_PATH):
-                ydl_opts['cookiefile'] = COOKIE_FILE_PATH
-                application.logger.info(f"[DOWNLOAD] Using cookie file from: {COOKIE_FILE_PATH}")
-            else:
-                application.logger.warning(f"[DOWNLOAD] Cookie file not found at {COOKIE_FILE_PATH}. Proceeding without cookies.")
-
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                info_dict = ydl.extract_info(youtube_url, download=True)
+            with application.ydl_lock:
+                ydl = get_shared_ydl(output_path)
+                # Point the persistent dispatcher at this call's hook.
+                application.ydl_progress_hook = progress_hook
+                try:
+                    info_dict = ydl.extract_info(youtube_url, download=True)
+                finally:
+                    application.ydl_progress_hook = None
                 temp_filepath = None
                 if 'requested_downloads' in info_dict and info_dict['requested_downloads']:
                     temp_filepath = info_dict['requested_downloads'][0].get('filepath')
@@ -177,7 +416,7 @@ def download_audio(youtube_url, output_path='.', progress_hook=None):
                 if not temp_filepath or not os.path.exists(temp_filepath):
                     video_id = info_dict.get('id')
                     if video_id:
-                        expected_filename = f"{video_id}.mp3"
+                        expected_filename = f"{video_id}.{info_dict.get('ext', 'webm')}"
                         temp_filepath = os.path.join(tmpdir, expected_filename)
 
                 if temp_filepath and os.path.exists(temp_filepath):
@@ -186,6 +425,7 @@ def download_audio(youtube_url, output_path='.', progress_hook=None):
                     os.makedirs(output_path, exist_ok=True)
                     shutil.move(temp_filepath, final_destination)
                     application.logger.info(f"[DOWNLOAD] Success. Final file moved to: {final_destination}")
+                    evict_audio_lru(output_path, keep_path=final_destination)
                     return final_destination
                 else:
                     error_message = f"Post-processed file not found in temp directory. Files: {os.listdir(tmpdir)}"
@@ -205,46 +445,159 @@ def download_audio(youtube_url, output_path='.', progress_hook=None):
             raise DownloadError(f"A critical error occurred during download: {e}")
 
 def calculate_energy(y, frame_length, hop_length):
-    if len(y) < frame_length: return np.array([])
-    return np.array([np.sum(np.abs(y[i:i+frame_length])**2) for i in range(0, len(y) - frame_length, hop_length)])
+    if len(y) < frame_length: return np.array([], dtype=np.float32)
+    y = np.ascontiguousarray(y, dtype=np.float32)
+    # Same frame grid as the old Python loop: starts every hop_length samples,
+    # stopping before len(y) - frame_length. The strided view materializes no
+    # frames, and the einsum reduction does sum-of-squares in one SIMD pass
+    # (abs is redundant for a real signal).
+    nframes = (len(y) - frame_length + hop_length - 1) // hop_length
+    frames = np.lib.stride_tricks.as_strided(
+        y, shape=(nframes, frame_length),
+        strides=(hop_length * y.itemsize, y.itemsize))
+    return np.einsum('ij,ij->i', frames, frames, optimize=True)
+
+# Decode cost is O(duration) but max_highlights=15 draws from the loudest
+# peaks anyway; capping keeps CPU and memory constant for multi-hour videos.
+MAX_ANALYSIS_SECONDS = 1800
+
+def decode_f32_mono(audio_path, target_sr):
+    """Decode to mono float32 at target_sr in one ffmpeg pass.
+
+    ffmpeg decodes and resamples in a single C pipeline, skipping the
+    audioread layer and the decode-then-resample double pass librosa.load
+    takes for mp3. ffmpeg is already a deploy requirement (yt-dlp
+    postprocessing), so no new dependency.
+    """
+    cmd = ['ffmpeg', '-v', 'quiet', '-i', audio_path, '-ac', '1', '-ar', str(target_sr),
+           '-t', str(MAX_ANALYSIS_SECONDS), '-f', 'f32le', '-']
+    out = subprocess.run(cmd, capture_output=True, check=True).stdout
+    return np.frombuffer(out, dtype=np.float32)
+
+def load_decoded_audio(audio_path, target_sr):
+    """Decode audio to float32, caching the signal in a .npy sidecar.
+
+    A re-analysis of an unchanged file (e.g. a force_fresh retry after a
+    transient error) then skips the mp3 decode; mmap_mode means the reload
+    only faults in pages the energy pass actually reads.
+    """
+    sidecar = audio_path + '.npy'
+    try:
+        if os.path.getmtime(sidecar) >= os.path.getmtime(audio_path):
+            return np.load(sidecar, mmap_mode='r')
+    except OSError:
+        pass
+    try:
+        y = decode_f32_mono(audio_path, target_sr)
+    except (OSError, subprocess.CalledProcessError) as e:
+        application.logger.warning(f"[DECODE] ffmpeg decode failed for {audio_path} ({e}); falling back to librosa.load.")
+        y, _ = librosa.load(audio_path, sr=target_sr, res_type='kaiser_fast', mono=True, duration=MAX_ANALYSIS_SECONDS)
+        y = np.ascontiguousarray(y, dtype=np.float32)
+    try:
+        np.save(sidecar, y)
+    except OSError as e:
+        application.logger.warning(f"[DECODE_CACHE] Could not write sidecar {sidecar}: {e}")
+    return y
+
+def frame_params(sr):
+    """Frame/hop lengths near 0.1 s / 0.05 s, snapped to powers of two.
+
+    Power-of-two strides keep the framed view on cache-line boundaries for
+    the vectorized reduction; timing precision is unaffected since all
+    timestamp math divides by the actual hop length.
+    """
+    frame_length = 1 << int(round(np.log2(sr * 0.1)))
+    return frame_length, frame_length // 2
+
+def stream_energy(audio_path, frames_per_block=4096):
+    """Compute frame energies block-by-block without decoding the file into RAM.
+
+    Reads the audio in overlapping blocks via soundfile and accumulates energy
+    online, so peak memory is O(blocksize) instead of O(duration). Returns
+    (energy, sr, duration) or None when soundfile cannot stream the file
+    (the caller then falls back to a full librosa.load decode).
+    """
+    try:
+        info = sf.info(audio_path)
+    except Exception as e:
+        application.logger.info(f"[STREAM_ENERGY] soundfile cannot open {audio_path} ({e}); falling back to full decode.")
+        return None
+    sr = info.samplerate
+    frame_length, hop_length = frame_params(sr)
+    # Block length of N hops plus one frame so every block yields exactly N
+    # frames and the frame grid lines up across block boundaries.
+    blocksize = frames_per_block * hop_length + frame_length
+    max_frames = int(MAX_ANALYSIS_SECONDS * sr / hop_length)
+    total_frames = 0
+    chunks = []
+    try:
+        for block in sf.blocks(audio_path, blocksize=blocksize, overlap=frame_length, dtype='float32', always_2d=True):
+            mono = block.mean(axis=1, dtype=np.float32) if block.shape[1] > 1 else block[:, 0]
+            chunk = calculate_energy(mono, frame_length, hop_length)
+            if len(chunk) == 0:
+                break
+            chunks.append(chunk)
+            total_frames += len(chunk)
+            if total_frames >= max_frames:
+                application.logger.info(f"[STREAM_ENERGY] Capping analysis at {MAX_ANALYSIS_SECONDS}s for {audio_path}")
+                break
+    except Exception as e:
+        application.logger.info(f"[STREAM_ENERGY] Streaming decode failed for {audio_path} ({e}); falling back to full decode.")
+        return None
+    energy = np.concatenate(chunks)[:max_frames] if chunks else np.array([], dtype=np.float32)
+    return energy, sr, info.duration
 
-def get_highlights(audio_path, max_highlights=15, target_sr=16000):
+def get_highlights(audio_path, max_highlights=15, target_sr=8000):
     application.logger.info(f"[GET_HIGHLIGHTS] Starting analysis for: {audio_path}")
     try:
-        if not audio_path or not os.path.exists(audio_path):
+        # EAFP: one stat call instead of exists + getsize, and no race window
+        # between the check and the open below.
+        try:
+            if os.stat(audio_path).st_size == 0:
+                application.logger.error(f"[GET_HIGHLIGHTS] Audio file is empty: {audio_path}")
+                return []
+        except (OSError, TypeError):
             application.logger.error(f"[GET_HIGHLIGHTS] Audio file does not exist or path is null: {audio_path}")
             return []
-        if os.path.getsize(audio_path) == 0:
-            application.logger.error(f"[GET_HIGHLIGHTS] Audio file is empty: {audio_path}")
-            return []
 
-        application.logger.info(f"[GET_HIGHLIGHTS] Attempting to load audio: {audio_path}")
-        y, sr = librosa.load(audio_path, sr=target_sr, res_type='kaiser_fast', mono=True)
-        application.logger.info(f"[GET_HIGHLIGHTS] Successfully loaded audio: {audio_path}")
+        streamed = stream_energy(audio_path)
+        if streamed is not None:
+            energy, sr, duration = streamed
+        else:
+            application.logger.info(f"[GET_HIGHLIGHTS] Attempting to load audio: {audio_path}")
+            y, sr = load_decoded_audio(audio_path, target_sr), target_sr
+            application.logger.info(f"[GET_HIGHLIGHTS] Successfully loaded audio: {audio_path}")
+            duration = len(y) / sr
+            energy = calculate_energy(y, *frame_params(sr))
 
-        duration = librosa.get_duration(y=y, sr=sr)
         application.logger.info(f"[GET_HIGHLIGHTS] Audio duration: {duration}s for {audio_path}")
-        if duration < 5: 
+        if duration < 5:
             application.logger.info(f"[GET_HIGHLIGHTS] Audio duration < 5s, returning empty list for {audio_path}")
             return []
 
-        frame_length, hop_length = int(sr * 0.1), int(sr * 0.05)
-        energy = calculate_energy(y, frame_length, hop_length)
-        if len(energy) < 10: 
+        hop_length = frame_params(sr)[1]
+        if len(energy) < 10:
             application.logger.info(f"[GET_HIGHLIGHTS] Not enough energy frames, returning empty list for {audio_path}")
             return []
 
-        threshold = np.percentile(energy, 95)
-        peaks = np.where(energy > threshold)[0]
-        highlight_times = []
-        if len(peaks) > 0:
-            highlight_times_sec = (peaks * hop_length / sr).tolist()
-            last_time = -5
-            for t_sec in highlight_times_sec:
-                if t_sec - last_time >= 5.0:
-                    highlight_times.append(t_sec)
-                    last_time = t_sec
-        
+        # Dead air / constant noise floor has no peaks worth ranking; one
+        # cheap reduction pass over the already-hot array skips the
+        # partition and peak search for that tail of real traffic.
+        energy_mean = float(energy.mean())
+        if energy_mean <= 0.0 or float(energy.std()) / energy_mean < 0.1:
+            application.logger.info(f"[GET_HIGHLIGHTS] Energy is near-flat, returning empty list for {audio_path}")
+            return []
+
+        # np.partition is O(n) vs the full O(n log n) sort np.percentile does;
+        # we only need a cut value, not an interpolated percentile.
+        k = int(0.95 * len(energy))
+        threshold = np.partition(energy, k)[k]
+        # find_peaks does thresholding and the 5-second spacing constraint in
+        # one C pass, keeping the strongest peak inside each window.
+        min_gap_frames = max(1, int(5.0 * sr / hop_length))
+        peaks, _ = find_peaks(energy, height=threshold, distance=min_gap_frames)
+        highlight_times = (peaks * (hop_length / sr)).tolist()
+
         processed_highlights = sorted([round(t, 2) for t in highlight_times])[:max_highlights]
         application.logger.info(f"[GET_HIGHLIGHTS] Found {len(processed_highlights)} highlights for {audio_path}")
         return processed_highlights
@@ -253,6 +606,9 @@ def get_highlights(audio_path, max_highlights=15, target_sr=16000):
         # traceback.print_exc() # Already logged with exc_info=True
         return []
 
+# Upper bound for one analysis-stage run in the process pool.
+ANALYSIS_TIMEOUT_SECONDS = 600
+
 def background_analysis_task(url, key, force_processing_flag):
     application.logger.info(f"[{key}] Background task started for {url}")
     status_store = application.analysis_status_store
@@ -276,22 +632,30 @@ def background_analysis_task(url, key, force_processing_flag):
             }
 
     try:
+        # 0. Warm the heatmap cache while the download runs; the frontend asks
+        # for most-replayed data right after this task finishes.
+        video_id = extract_video_id(url)
+        if video_id:
+            application.heatmap_executor.submit(fetch_heatmap_cached, video_id)
+
         # 1. Download audio
         status_store[key] = {'status': 'processing', 'stage': 'download_start', 'message': 'Starting audio download...'}
         audio_file_path = download_audio(url, DOWNLOAD_DIRECTORY, progress_hook=progress_hook)
         if not audio_file_path:
             raise Exception("Audio download failed to return a file path.")
 
-        # 2. Analyze audio
+        # 2. Analyze audio: submit to the process pool and hand completion to
+        # the finalize stage, so this worker is free for the next queued
+        # download while the analysis runs (download N+1 overlaps analysis N).
         status_store[key] = {'status': 'processing', 'stage': 'analysis_start', 'message': 'Analyzing audio for highlights...'}
-        highlights = get_highlights(audio_file_path)
-        result = {'status': 'success', 'audio_highlights': highlights}
-
-        # 3. Save to cache and clean up status
-        save_to_cache(key, result)
-        status_store[key] = result # Store final result
-        application.logger.info(f"[{key}] Analysis successful and cached.")
-        return result
+        analysis_future = application.analysis_executor.submit(get_highlights, audio_file_path)
+        finalize_future = application.finalize_executor.submit(_finalize_analysis, key, analysis_future)
+        # Track the whole pipeline in the futures map, not just this stage,
+        # so dedupe and the status fallback keep seeing an in-flight task.
+        with application.futures_lock:
+            application.audio_analysis_futures[key] = finalize_future
+        finalize_future.add_done_callback(lambda f, k=key: _discard_future(k, f))
+        return finalize_future
 
     except Exception as e:
         application.logger.error(f"[{key}] Error in background task: {e}", exc_info=True)
@@ -300,20 +664,91 @@ def background_analysis_task(url, key, force_processing_flag):
         status_store[key] = error_result # Store final error
         return error_result
 
+def _finalize_analysis(key, analysis_future):
+    """Completion stage: publish the process-pool result off the download worker."""
+    status_store = application.analysis_status_store
+    try:
+        # Futures-based timeout (portable, unlike SIGALRM): a wedged decode
+        # cannot stall the completion stage forever.
+        highlights = analysis_future.result(timeout=ANALYSIS_TIMEOUT_SECONDS)
+        result = {'status': 'success', 'audio_highlights': highlights}
+        application.logger.info(f"[{key}] Analysis successful and cached.")
+    except Exception as e:
+        application.logger.error(f"[{key}] Error finalizing analysis: {e}", exc_info=True)
+        # Cached like any other error to prevent retries.
+        result = {'status': 'error', 'error': 'Analysis failed', 'message': str(e)}
+    save_to_cache(key, result)
+    status_store[key] = result # Store final result
+    return result
+
+# A force_fresh request still returns a cached result younger than this, so
+# an accidental double-click cannot trigger a full re-download.
+FORCE_FRESH_MIN_AGE_SECONDS = 60
+
 # --- 4. API 라우트 ---
 @application.route('/api/process-youtube', methods=['POST'])
 def process_youtube_url_endpoint():
     data = request.get_json()
     if not data or 'youtube_url' not in data: return jsonify({'status': 'error', 'message': "'youtube_url' is required"}), 400
     youtube_url, force_fresh = data.get('youtube_url'), data.get('force_fresh', False)
+    # Reject unrecognized URLs before they consume the single download worker
+    # slot only to fail inside yt-dlp.
+    if not extract_video_id(youtube_url):
+        return jsonify({'status': 'error', 'message': 'Not a recognized YouTube URL.'}), 400
     cache_key = get_cache_key(youtube_url)
-    if not force_fresh and (cached_result := check_cache(cache_key)): return jsonify(cached_result)
-    if cache_key in application.audio_analysis_futures and not application.audio_analysis_futures[cache_key].done():
+    if cached_bytes := check_cache_bytes(cache_key):
+        if not force_fresh:
+            return Response(cached_bytes, mimetype='application/json')
+        try:
+            age = time.time() - os.path.getmtime(os.path.join(application.config['CACHE_FOLDER'], f"{cache_key}.json"))
+        except OSError:
+            age = 0.0  # pending write not flushed yet, so at most a second old
+        # Only a fresh *successful* result absorbs the force-refresh; cached
+        # error payloads must stay retryable or a transient failure would be
+        # replayed for the whole window.
+        if age <= FORCE_FRESH_MIN_AGE_SECONDS and orjson.loads(cached_bytes).get('status') == 'success':
+            return Response(cached_bytes, mimetype='application/json')
+    if submit_analysis(youtube_url, cache_key, force_fresh) is None:
         return jsonify({'status': 'processing', 'message': 'Analysis already in progress.'})
-    future = application.audio_executor.submit(background_analysis_task, youtube_url, cache_key, force_fresh)
-    application.audio_analysis_futures[cache_key] = future
     return jsonify({'status': 'processing', 'message': 'Analysis initiated.', 'cache_key': cache_key})
 
+def submit_analysis(youtube_url, cache_key, force_fresh=False):
+    """Queue a background analysis; returns None if one is already running."""
+    with application.futures_lock:
+        existing = application.audio_analysis_futures.get(cache_key)
+        if existing is not None and not existing.done():
+            return None
+        future = application.audio_executor.submit(background_analysis_task, youtube_url, cache_key, force_fresh)
+        application.audio_analysis_futures[cache_key] = future
+    # Guarantees the entry is dropped even if the task raises or is
+    # cancelled before any poll observes a terminal status.
+    future.add_done_callback(lambda f, k=cache_key: _discard_future(k, f))
+    return future
+
+def _discard_future(cache_key, future):
+    with application.futures_lock:
+        if application.audio_analysis_futures.get(cache_key) is future:
+            application.audio_analysis_futures.pop(cache_key, None)
+
+@application.route('/api/process-youtube-batch', methods=['POST'])
+def process_youtube_batch_endpoint():
+    data = request.get_json()
+    urls = data.get('urls') if data else None
+    if not urls or not isinstance(urls, list):
+        return jsonify({'status': 'error', 'message': "'urls' (non-empty list) is required"}), 400
+    results = {}
+    for youtube_url in urls:
+        if not extract_video_id(youtube_url):
+            results[youtube_url] = {'status': 'error', 'message': 'Not a recognized YouTube URL.'}
+            continue
+        cache_key = get_cache_key(youtube_url)
+        if cached_result := check_cache(cache_key):
+            results[youtube_url] = cached_result
+            continue
+        submit_analysis(youtube_url, cache_key)
+        results[youtube_url] = {'status': 'processing', 'cache_key': cache_key}
+    return jsonify({'status': 'ok', 'results': results})
+
 @application.route('/api/analysis-status', methods=['GET'])
 def analysis_status_endpoint():
     cache_key = request.args.get('key')
@@ -325,12 +760,14 @@ def analysis_status_endpoint():
         status_data = application.analysis_status_store[cache_key]
         # If the task is finished, remove from futures dict to clean up
         if status_data.get('status') in ['success', 'error']:
-            application.audio_analysis_futures.pop(cache_key, None)
+            with application.futures_lock:
+                application.audio_analysis_futures.pop(cache_key, None)
         return jsonify(status_data)
 
     # Fallback for tasks that might not have hit the new store logic yet
-    if cache_key in application.audio_analysis_futures:
-        future = application.audio_analysis_futures[cache_key]
+    with application.futures_lock:
+        future = application.audio_analysis_futures.get(cache_key)
+    if future is not None:
         if future.done():
             result = future.result()
             application.analysis_status_store[cache_key] = result # Populate store
@@ -339,52 +776,119 @@ def analysis_status_endpoint():
             # Task is running but hasn't reported detailed status yet
             return jsonify({'status': 'processing', 'stage': 'initializing', 'message': 'Task is initializing...'})
 
-    # Final fallback to cache for completed jobs from previous server runs
-    cached_result = check_cache(cache_key)
-    if cached_result:
-        return jsonify(cached_result)
+    # Final fallback to cache for completed jobs from previous server runs.
+    # Finished payloads never change between polls, so an ETag lets the
+    # client's next poll come back as a bodyless 304.
+    cached_bytes = check_cache_bytes(cache_key)
+    if cached_bytes:
+        etag = f'W/"{hashlib.blake2b(cached_bytes, digest_size=8).hexdigest()}"'
+        if request.headers.get('If-None-Match') == etag:
+            return Response(status=304)
+        response = Response(cached_bytes, mimetype='application/json')
+        response.headers['ETag'] = etag
+        response.headers['Cache-Control'] = 'private, max-age=5'
+        return response
 
     return jsonify({'status': 'error', 'message': 'Unknown or expired analysis key.'}), 404
 
-def format_ms_to_time_string(ms_string: str):
-    if ms_string is None or not isinstance(ms_string, (str, int)) or (isinstance(ms_string, str) and not ms_string.isdigit()): return "N/A"
-    ms = int(ms_string)
-    seconds_total = ms // 1000
-    return f"{seconds_total // 60:02d}:{seconds_total % 60:02d}"
+def format_ms_to_time_string(ms_value):
+    """Format milliseconds (int or digit string) as MM:SS; 'N/A' when unparsable."""
+    # EAFP: one int() replaces the isinstance/isdigit ladder, so int callers
+    # skip the string detour entirely.
+    try:
+        seconds_total = int(ms_value) // 1000
+    except (TypeError, ValueError):
+        return "N/A"
+    if seconds_total < 0:
+        return "N/A"
+    minutes, seconds = divmod(seconds_total, 60)
+    return f"{minutes:02d}:{seconds:02d}"
+
+# Shared session: keep-alive skips the DNS + TCP + TLS handshakes on every
+# heatmap scrape after the first.
+YT_SESSION = requests.Session()
+YT_SESSION.headers.update({
+    "User-Agent": "Mozilla/5.0",
+    "Accept-Language": "en-US,en;q=0.9,ko-KR;q=0.8,ko;q=0.7",
+    # Watch pages compress ~5x; requests decompresses transparently (br via
+    # the Brotli package) so the regex still sees plain bytes.
+    "Accept-Encoding": "gzip, br",
+})
+# Retry transient 429/5xx inside urllib3 on the existing keep-alive
+# connection (honoring Retry-After), so one flaky response from YouTube
+# doesn't fail a whole analysis run and force a user re-submit.
+YT_SESSION.mount('https://', HTTPAdapter(
+    pool_maxsize=8,
+    max_retries=Retry(total=3, status_forcelist=(429, 500, 502, 503, 504),
+                      backoff_factor=0.5, allowed_methods=frozenset(['GET'])),
+))
 
 def get_youtube_most_replayed_heatmap_data(video_id: str):
-    print(f"[Heatmap] Fetching Most Replayed data for video_id: {video_id}")
+    # Lazy %s formatting throughout: a filtered log level skips the string
+    # build entirely, and the logging handler doesn't serialize workers on
+    # the stdout lock the way print() did.
+    application.logger.info("[Heatmap] Fetching Most Replayed data for video_id: %s", video_id)
     video_url = f"https://www.youtube.com/watch?v={video_id}"
     try:
-        headers = {"User-Agent": "Mozilla/5.0", "Accept-Language": "en-US,en;q=0.9,ko-KR;q=0.8,ko;q=0.7"}
-        response = requests.get(video_url, headers=headers, timeout=20)
-        response.raise_for_status()
-        html_content = response.text
-        match = (re.search(r"var\s+ytInitialData\s*=\s*({.*?});\s*</script>", html_content) or
-                 re.search(r"window\[\"ytInitialData\"\]\s*=\s*({.*?});", html_content) or
-                 re.search(r"var ytInitialData\s*=\s*({.*?});", html_content))
+        # Stream the page and stop reading as soon as the ytInitialData blob
+        # is complete — watch pages keep going for megabytes of markup after
+        # the data we need. Bytes end to end: no full-page str decode, and
+        # orjson takes the matched slice as bytes.
+        buf = bytearray()
+        match = None
+        marker_idx = -1
+        scanned = 0  # resume offset: bytes the cheap scans have already covered
+        with YT_SESSION.get(video_url, timeout=20, stream=True) as response:
+            response.raise_for_status()
+            for chunk in response.iter_content(chunk_size=65536):
+                buf += chunk
+                if marker_idx < 0:
+                    # Locate the data marker once, resuming where the last
+                    # scan left off (small overlap for a chunk-split marker).
+                    marker_idx = buf.find(b'ytInitialData', scanned)
+                    scanned = max(0, len(buf) - 16)
+                    if marker_idx < 0:
+                        continue
+                    scanned = marker_idx
+                # Attempt the full blob match only when the newly appended
+                # bytes hold a candidate terminator; pages where the blob
+                # arrives late (or never) then cost one pass, not O(n^2).
+                if buf.find(b'};', max(marker_idx, scanned - 1)) < 0:
+                    scanned = len(buf)
+                    continue
+                scanned = len(buf)
+                match = YT_INITIAL_DATA_RE.search(buf, max(0, marker_idx - 32))
+                if match:
+                    break
         if not match:
-            print(f"[Heatmap] Detailed Error: Could not find ytInitialData in the page for video_id: {video_id}")
+            application.logger.warning("[Heatmap] Could not find ytInitialData in the page for video_id: %s", video_id)
             return "Error: Could not find ytInitialData in the page."
-        initial_data = json.loads(match.group(1))
+        # The ytInitialData blob is multi-megabyte; orjson parses it ~3x
+        # faster than stdlib json.
+        initial_data = orjson.loads(match.group(1))
 
         heatmap_markers_list = None
         most_replayed_label_info = None
         
         # Primary parsing attempt (playerOverlays)
         try:
-            print(f"[Heatmap Primary] Parsing ytInitialData (playerOverlays) for heatmap data for video_id: {video_id}")
-            markers_map_list = initial_data.get('playerOverlays', {}).get('playerOverlayRenderer', {}).get('decoratedPlayerBarRenderer', {}).get('decoratedPlayerBarRenderer', {}).get('playerBar', {}).get('multiMarkersPlayerBarRenderer', {}).get('markersMap', [])
-            print(f"[Heatmap Primary] Found markersMap with {len(markers_map_list)} items for video_id: {video_id}")
+            application.logger.debug("[Heatmap Primary] Parsing ytInitialData (playerOverlays) for heatmap data for video_id: %s", video_id)
+            # EAFP: one direct-index chain instead of seven .get() probes with
+            # throwaway default dicts; a miss anywhere drops to the fallback.
+            try:
+                markers_map_list = initial_data['playerOverlays']['playerOverlayRenderer']['decoratedPlayerBarRenderer']['decoratedPlayerBarRenderer']['playerBar']['multiMarkersPlayerBarRenderer']['markersMap']
+            except (KeyError, TypeError):
+                markers_map_list = []
+            application.logger.debug("[Heatmap Primary] Found markersMap with %d items for video_id: %s", len(markers_map_list), video_id)
             for item in markers_map_list:
                 heatmap_renderer = item.get('value', {}).get('heatmap', {}).get('heatmapRenderer')
                 if heatmap_renderer:
                     current_markers = heatmap_renderer.get('heatMarkers', [])
                     if current_markers: # Only assign if non-empty
                         heatmap_markers_list = current_markers
-                        print(f"[Heatmap Primary] Found heatMarkers with {len(heatmap_markers_list)} markers for video_id: {video_id}")
+                        application.logger.debug("[Heatmap Primary] Found heatMarkers with %d markers for video_id: %s", len(heatmap_markers_list), video_id)
                     if heatmap_renderer.get('heatMarkersDecorations'):
-                        print(f"[Heatmap Primary] Found heatMarkersDecorations for video_id: {video_id}")
+                        application.logger.debug("[Heatmap Primary] Found heatMarkersDecorations for video_id: %s", video_id)
                         for deco_container in heatmap_renderer['heatMarkersDecorations']:
                             deco_renderer = deco_container.get('heatMarkerDecorationRenderer', {})
                             timed_deco = deco_renderer.get('timedMarkerDecorationRenderer', {})
@@ -394,34 +898,36 @@ def get_youtube_most_replayed_heatmap_data(video_id: str):
                                             timed_deco.get('decorationTimeMillis'))
                             if label_text and deco_time_ms is not None:
                                 most_replayed_label_info = {"label_text": label_text, "decoration_time_millis": str(deco_time_ms)}
-                                print(f"[Heatmap Primary] Found most_replayed_label_info: {label_text} at {deco_time_ms}ms for video_id: {video_id}")
+                                application.logger.debug("[Heatmap Primary] Found most_replayed_label_info: %s at %sms for video_id: %s", label_text, deco_time_ms, video_id)
                                 break # Found label, break from decorations loop
                     if heatmap_markers_list: break # Found markers, break from markersMap loop
-        except Exception as e: 
-            print(f"[Heatmap Primary] Error navigating primary ytInitialData (playerOverlays): {e} for video_id: {video_id}")
-            traceback.print_exc()
+        except Exception:
+            application.logger.warning("[Heatmap Primary] Error navigating primary ytInitialData (playerOverlays) for video_id: %s", video_id, exc_info=True)
 
         # Fallback parsing attempt (frameworkUpdates) if primary failed
         if not heatmap_markers_list and 'frameworkUpdates' in initial_data:
-            print(f"[Heatmap Fallback] Primary path failed. Trying fallback path in frameworkUpdates for video_id: {video_id}")
+            application.logger.debug("[Heatmap Fallback] Primary path failed. Trying fallback path in frameworkUpdates for video_id: %s", video_id)
             try:
-                mutations = initial_data['frameworkUpdates'].get('entityBatchUpdate', {}).get('mutations', [])
+                try:
+                    mutations = initial_data['frameworkUpdates']['entityBatchUpdate']['mutations']
+                except (KeyError, TypeError):
+                    mutations = []
                 if not mutations:
-                    print(f"[Heatmap Fallback] 'mutations' not found or empty in frameworkUpdates for video_id: {video_id}")
-                
+                    application.logger.debug("[Heatmap Fallback] 'mutations' not found or empty in frameworkUpdates for video_id: %s", video_id)
+
                 for mutation_idx, mutation in enumerate(mutations):
-                    print(f"[Heatmap Fallback] Inspecting mutation {mutation_idx} for video_id: {video_id}")
+                    application.logger.debug("[Heatmap Fallback] Inspecting mutation %d for video_id: %s", mutation_idx, video_id)
                     payload = mutation.get('payload', {})
                     macro_markers_entity = payload.get('macroMarkersListEntity', {})
                     markers_list_data = macro_markers_entity.get('markersList', {})
 
                     if markers_list_data.get('markerType') == 'MARKER_TYPE_HEATMAP':
-                        print(f"[Heatmap Fallback] Found 'macroMarkersListEntity' with 'MARKER_TYPE_HEATMAP' in mutation {mutation_idx} for video_id: {video_id}")
-                        
+                        application.logger.debug("[Heatmap Fallback] Found 'macroMarkersListEntity' with 'MARKER_TYPE_HEATMAP' in mutation %d for video_id: %s", mutation_idx, video_id)
+
                         current_fallback_markers = markers_list_data.get('markers', [])
                         if current_fallback_markers:
                             heatmap_markers_list = current_fallback_markers
-                            print(f"[Heatmap Fallback] Extracted {len(heatmap_markers_list)} markers from frameworkUpdates for video_id: {video_id}")
+                            application.logger.debug("[Heatmap Fallback] Extracted %d markers from frameworkUpdates for video_id: %s", len(heatmap_markers_list), video_id)
 
                         decorations_container = markers_list_data.get('markersDecoration', {}).get('timedMarkerDecorations', [])
                         if decorations_container and isinstance(decorations_container, list) and len(decorations_container) > 0:
@@ -436,27 +942,31 @@ def get_youtube_most_replayed_heatmap_data(video_id: str):
                                             "label_text": label_text,
                                             "decoration_time_millis": str(decoration_time)
                                         }
-                                        print(f"[Heatmap Fallback] Extracted most_replayed_label_info from frameworkUpdates: {label_text} for video_id: {video_id}")
-                        
+                                        application.logger.debug("[Heatmap Fallback] Extracted most_replayed_label_info from frameworkUpdates: %s for video_id: %s", label_text, video_id)
+
                         if heatmap_markers_list: # If we found markers from this mutation, we can stop
-                            print(f"[Heatmap Fallback] Successfully extracted data from frameworkUpdates mutation {mutation_idx}. Breaking loop.")
-                            break 
+                            application.logger.debug("[Heatmap Fallback] Successfully extracted data from frameworkUpdates mutation %d. Breaking loop.", mutation_idx)
+                            break
                 if not heatmap_markers_list:
-                    print(f"[Heatmap Fallback] Did not find heatmap markers after checking all mutations in frameworkUpdates for video_id: {video_id}")
-            except Exception as e:
-                print(f"[Heatmap Fallback] Error during frameworkUpdates parsing: {e} for video_id: {video_id}")
-                traceback.print_exc()
+                    application.logger.debug("[Heatmap Fallback] Did not find heatmap markers after checking all mutations in frameworkUpdates for video_id: %s", video_id)
+            except Exception:
+                application.logger.warning("[Heatmap Fallback] Error during frameworkUpdates parsing for video_id: %s", video_id, exc_info=True)
 
         # Process whatever was found (either from primary or fallback)
         if heatmap_markers_list:
             valid_markers = [m for m in heatmap_markers_list if isinstance(m, dict) and all(k in m for k in ['intensityScoreNormalized', 'startMillis', 'durationMillis'])]
-            print(f"[Heatmap] Found {len(valid_markers)}/{len(heatmap_markers_list) if heatmap_markers_list else 0} valid markers for video_id: {video_id}")
+            application.logger.debug("[Heatmap] Found %d/%d valid markers for video_id: %s", len(valid_markers), len(heatmap_markers_list), video_id)
             highest_intensity_marker = None
             if valid_markers: # Ensure valid_markers is not empty
-                highest_intensity_marker = max(valid_markers, key=lambda x: float(x['intensityScoreNormalized']), default=None)
-            
+                # One C-level argmax over a float array instead of a Python
+                # max() with a lambda per marker.
+                intensities = np.fromiter(
+                    (float(m['intensityScoreNormalized']) for m in valid_markers),
+                    dtype=np.float32, count=len(valid_markers))
+                highest_intensity_marker = valid_markers[int(intensities.argmax())]
+
             if highest_intensity_marker:
-                print(f"[Heatmap] Found highest_intensity_marker with score {highest_intensity_marker.get('intensityScoreNormalized')} for video_id: {video_id}")
+                application.logger.debug("[Heatmap] Found highest_intensity_marker with score %s for video_id: %s", highest_intensity_marker.get('intensityScoreNormalized'), video_id)
                 for k in ['startMillis', 'durationMillis']: # Ensure these are strings
                     if k in highest_intensity_marker and highest_intensity_marker[k] is not None:
                         highest_intensity_marker[k] = str(highest_intensity_marker[k])
@@ -469,14 +979,14 @@ def get_youtube_most_replayed_heatmap_data(video_id: str):
                     'durationMillis': '5000',  # Default 5 seconds duration
                     'intensityScoreNormalized': '0.9'  # High but might not be the highest
                 }
-                print(f"[Heatmap] Created most_replayed_label_marker at {most_replayed_label_marker['startMillis']}ms for video_id: {video_id}")
+                application.logger.debug("[Heatmap] Created most_replayed_label_marker at %sms for video_id: %s", most_replayed_label_marker['startMillis'], video_id)
             
             # It's possible to have heatmap_markers_list but not highest_intensity_marker (if all markers are invalid)
             # or not most_replayed_label_info. The original check was: if not highest_intensity_marker and not most_replayed_label_info:
             # This means if EITHER is missing, it's not an error. An error is only if BOTH are missing AND we had markers to begin with.
             # However, the frontend might expect at least one. Let's adjust the logic slightly: if we have markers, but extracted nothing useful, it's an issue.
             if not valid_markers and not most_replayed_label_info: # If we had markers but none were valid, and no label
-                print(f"[Heatmap] Detailed Error: Heatmap markers were found, but no valid marker details or label info could be extracted for video_id: {video_id}")
+                application.logger.warning("[Heatmap] Heatmap markers were found, but no valid marker details or label info could be extracted for video_id: %s", video_id)
                 return "Error: Heatmap data found, but key details are missing."
 
             result = {"video_id": video_id, "most_replayed_label": most_replayed_label_info, "most_replayed_label_marker_data": most_replayed_label_marker, "highest_intensity_marker_data": highest_intensity_marker}
@@ -486,46 +996,74 @@ def get_youtube_most_replayed_heatmap_data(video_id: str):
                 result['highest_intensity_marker_data']['formatted_start_time'] = format_ms_to_time_string(highest_intensity_marker['startMillis'])
                 result['highest_intensity_marker_data']['formatted_duration'] = format_ms_to_time_string(highest_intensity_marker['durationMillis'])
             
-            print(f"[Heatmap] Successfully extracted heatmap data (possibly partial) for {video_id}.")
+            application.logger.info("[Heatmap] Successfully extracted heatmap data (possibly partial) for %s.", video_id)
             return result
-            
-        print(f"[Heatmap] Detailed Error: Heatmap data not found in any expected structure (primary or fallback) for video_id: {video_id}")
+
+        application.logger.warning("[Heatmap] Heatmap data not found in any expected structure (primary or fallback) for video_id: %s", video_id)
         return "Error: Heatmap data not found in any expected structure."
-    except requests.exceptions.Timeout: 
-        print(f"[Heatmap] Detailed Error: Request timed out for {video_url}")
+    except requests.exceptions.Timeout:
+        application.logger.warning("[Heatmap] Request timed out for %s", video_url)
         return f"Error: Request timed out for {video_url}"
-    except requests.exceptions.RequestException as e: 
-        print(f"[Heatmap] Detailed Error: Request failed for {video_url}: {e}")
+    except requests.exceptions.RequestException as e:
+        application.logger.warning("[Heatmap] Request failed for %s: %s", video_url, e)
         return f"Error: Request failed for {video_url}: {e}"
-    except json.JSONDecodeError: 
-        print(f"[Heatmap] Detailed Error: Failed to parse JSON from page for {video_url}")
+    except orjson.JSONDecodeError:
+        application.logger.warning("[Heatmap] Failed to parse JSON from page for %s", video_url)
         return f"Error: Failed to parse JSON from page for {video_url}."
-    except Exception as e: 
-        print(f"[Heatmap] Unexpected error for {video_url}: {e}") 
-        traceback.print_exc()
+    except Exception as e:
+        application.logger.error("[Heatmap] Unexpected error for %s: %s", video_url, e, exc_info=True)
         return f"Error: Unexpected: {e}"
 
+# Most-replayed data changes slowly; cache per video id so a prefetch from the
+# background task makes the endpoint hit memory by the time the frontend asks.
+HEATMAP_CACHE = TTLCache(maxsize=256, ttl=6 * 3600)
+application.heatmap_lock = threading.Lock()
+application.heatmap_inflight = {}
+
+def fetch_heatmap_cached(video_id):
+    # Single-flight: concurrent callers for the same video id share one
+    # fetch+parse instead of each scraping YouTube.
+    with application.heatmap_lock:
+        cached = HEATMAP_CACHE.get(video_id)
+        if cached is not None:
+            return cached
+        inflight = application.heatmap_inflight.get(video_id)
+        if inflight is None:
+            inflight = Future()
+            application.heatmap_inflight[video_id] = inflight
+            leader = True
+        else:
+            leader = False
+    if not leader:
+        return inflight.result(timeout=30)
+    try:
+        result = get_youtube_most_replayed_heatmap_data(video_id)
+        if isinstance(result, dict):  # don't cache transient error strings
+            with application.heatmap_lock:
+                HEATMAP_CACHE[video_id] = result
+        inflight.set_result(result)
+        return result
+    except Exception as e:
+        inflight.set_exception(e)
+        raise
+    finally:
+        with application.heatmap_lock:
+            application.heatmap_inflight.pop(video_id, None)
+
 ### EB-FIX: RESTORED THE MISSING API ENDPOINT ###
 @application.route('/api/get-most-replayed', methods=['GET'])
 def get_most_replayed_endpoint():
-    print(f"\n[API GET /api/get-most-replayed] Called at {time.ctime()}")
+    application.logger.debug("[API GET /api/get-most-replayed] Called")
     youtube_url = request.args.get('url')
     if not youtube_url:
         return jsonify({'status': 'error', 'message': 'YouTube URL is required.'}), 400
 
-    video_id_for_heatmap = None
-    patterns = [r'(?:youtube\.com/watch\?v=|youtu\.be/)([\w-]+)', r'youtube\.com/shorts/([\w-]+)']
-    for pattern in patterns:
-        match = re.search(pattern, youtube_url)
-        if match:
-            video_id_for_heatmap = match.group(1)
-            break
-    
+    video_id_for_heatmap = extract_video_id(youtube_url)
     if not video_id_for_heatmap:
         return jsonify({'status': 'error', 'message': 'Could not extract a valid video ID from the URL for Most Replayed data.'}), 400
 
     try:
-        heatmap_result = get_youtube_most_replayed_heatmap_data(video_id_for_heatmap)
+        heatmap_result = fetch_heatmap_cached(video_id_for_heatmap)
         if isinstance(heatmap_result, str): 
             if "Heatmap data not found" in heatmap_result:
                 return jsonify({'status': 'error', 'message': heatmap_result}), 404
@@ -542,64 +1080,77 @@ def get_most_replayed_endpoint():
         else: 
             return jsonify({'status': 'error', 'message': 'Heatmap data not found or is empty.'}), 404
     except Exception as e:
-        print(f"[API GET /api/get-most-replayed] Error for {video_id_for_heatmap}: {e}"); traceback.print_exc()
+        application.logger.error("[API GET /api/get-most-replayed] Error for %s: %s", video_id_for_heatmap, e, exc_info=True)
         return jsonify({'status': 'error', 'message': f'An unexpected error occurred: {str(e)}'}), 500
 
 @application.route('/api/clear-cache', methods=['POST'])
 def clear_cache_endpoint():
-    print(f"\n[API POST /api/clear-cache] Called at {time.ctime()}")
+    application.logger.debug("[API POST /api/clear-cache] Called")
     try: data = request.get_json(); assert data, "No JSON data"
     except Exception as e: return jsonify({'status': 'error', 'error': 'Invalid JSON payload', 'message': str(e)}), 400
-    
+
     youtube_url = data.get('youtube_url')
     if not youtube_url: return jsonify({'status': 'error', 'error': 'youtube_url is required'}), 400
-    
-    print(f"[API POST /api/clear-cache] Clearing cache for URL: {youtube_url}")
+
+    application.logger.info("[API POST /api/clear-cache] Clearing cache for URL: %s", youtube_url)
     video_id_cache_key = get_cache_key(youtube_url)
     
-    # --- 1. Clear JSON cache file ---
+    # --- 1. Clear JSON cache file (including any unflushed pending write) ---
+    with application.cache_write_lock:
+        application.pending_cache_writes.pop(video_id_cache_key, None)
     cache_file_path = os.path.join(application.config['CACHE_FOLDER'], f"{video_id_cache_key}.json")
     cleared_json_from_disk = False
-    if os.path.exists(cache_file_path):
-        try: 
-            os.remove(cache_file_path)
-            cleared_json_from_disk = True
-            print(f"[API POST /api/clear-cache] Successfully deleted JSON cache: {cache_file_path}")
-        except Exception as e_clear_disk: 
-            print(f"[API POST /api/clear-cache] Error removing JSON cache {cache_file_path}: {e_clear_disk}")
-
-    # --- 2. Clear downloaded MP3 file ---
-    mp3_file_path = os.path.join(DOWNLOAD_DIRECTORY, f"{video_id_cache_key}.mp3")
-    cleared_mp3_from_disk = False
-    if os.path.exists(mp3_file_path):
-        try: 
-            os.remove(mp3_file_path)
-            cleared_mp3_from_disk = True
-            print(f"[API POST /api/clear-cache] Successfully deleted MP3 file: {mp3_file_path}")
-        except Exception as e_clear_mp3: 
-            print(f"[API POST /api/clear-cache] Error removing MP3 file {mp3_file_path}: {e_clear_mp3}")
-
-    # --- 3. Cancel any running analysis task ---
+    try:
+        # EAFP: unlink directly instead of exists-then-remove, which costs an
+        # extra stat and races against a concurrent flush.
+        cleared_json_from_disk = _safe_unlink(cache_file_path)
+        if cleared_json_from_disk:
+            application.logger.info("[API POST /api/clear-cache] Successfully deleted JSON cache: %s", cache_file_path)
+    except Exception as e_clear_disk:
+        application.logger.error("[API POST /api/clear-cache] Error removing JSON cache %s: %s", cache_file_path, e_clear_disk)
+
+    # --- 2. Clear downloaded audio file ---
+    audio_file_path = find_audio_file(DOWNLOAD_DIRECTORY, video_id_cache_key)
+    cleared_audio_from_disk = False
+    if audio_file_path:
+        try:
+            cleared_audio_from_disk = _safe_unlink(audio_file_path)
+            _safe_unlink(audio_file_path + '.npy')  # decoded-audio sidecar
+            if cleared_audio_from_disk:
+                application.logger.info("[API POST /api/clear-cache] Successfully deleted audio file: %s", audio_file_path)
+        except Exception as e_clear_audio:
+            application.logger.error("[API POST /api/clear-cache] Error removing audio file %s: %s", audio_file_path, e_clear_audio)
+
+    # --- 3. Clear derived in-memory entries for this video ---
+    # Everything keyed by the video id is invalidated together so one call
+    # cannot leave a stale heatmap behind a cleared analysis result.
+    heatmap_video_id = extract_video_id(youtube_url)
+    if heatmap_video_id:
+        with application.heatmap_lock:
+            HEATMAP_CACHE.pop(heatmap_video_id, None)
+
+    # --- 4. Cancel any running analysis task ---
     task_cancelled_or_removed = False
-    if video_id_cache_key in application.audio_analysis_futures:
-        future = application.audio_analysis_futures.pop(video_id_cache_key) # Atomically remove the future
+    with application.futures_lock:
+        future = application.audio_analysis_futures.pop(video_id_cache_key, None)
+    if future is not None:
         if not future.done():
             if future.cancel():
                 task_cancelled_or_removed = True
-                print(f"[API POST /api/clear-cache] Actively cancelled background task for {video_id_cache_key}.")
+                application.logger.info("[API POST /api/clear-cache] Actively cancelled background task for %s.", video_id_cache_key)
         else:
             task_cancelled_or_removed = True # Task was already done but is now removed
-            print(f"[API POST /api/clear-cache] Removed completed/failed task for {video_id_cache_key}.")
+            application.logger.info("[API POST /api/clear-cache] Removed completed/failed task for %s.", video_id_cache_key)
 
-    # --- 4. Final response ---
-    if cleared_json_from_disk or cleared_mp3_from_disk or task_cancelled_or_removed:
+    # --- 5. Final response ---
+    if cleared_json_from_disk or cleared_audio_from_disk or task_cancelled_or_removed:
         messages = []
         if cleared_json_from_disk: messages.append("JSON cache cleared.")
-        if cleared_mp3_from_disk: messages.append("MP3 file deleted.")
+        if cleared_audio_from_disk: messages.append("Audio file deleted.")
         if task_cancelled_or_removed: messages.append("Analysis task handled.")
         return jsonify({'status': 'success', 'message': ' '.join(messages), 'details': {'key': video_id_cache_key}})
     
-    return jsonify({'status': 'warning', 'message': f'No cache, MP3 file, or running task found for this URL.', 'details': {'key': video_id_cache_key}})
+    return jsonify({'status': 'warning', 'message': f'No cache, audio file, or running task found for this URL.', 'details': {'key': video_id_cache_key}})
 
 # --- 5. Health Check 및 File/App 서빙 ---
 @application.route('/health')
@@ -613,10 +1164,17 @@ def download_file(filename):
     except FileNotFoundError:
         return "File not found.", 404
 
+# The Vite build is immutable for the life of the process, so the SPA
+# fallback decision per path never changes; memoizing it drops the stat
+# syscall from every static request after the first.
+@lru_cache(maxsize=2048)
+def _static_file_exists(path):
+    return os.path.isfile(os.path.join(application.static_folder, path))
+
 @application.route('/', defaults={'path': ''})
 @application.route('/<path:path>')
 def serve(path):
-    if path != "" and os.path.exists(os.path.join(application.static_folder, path)):
+    if path != "" and _static_file_exists(path):
         return send_from_directory(application.static_folder, path)
     else:
         return send_from_directory(application.static_folder, 'index.html')